@@ -3,126 +3,137 @@
 import json
 import sys
 
-import matplotlib
-matplotlib.use('Agg')  # headless rendering in CI
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
-import numpy as np
-from matplotlib.colors import ListedColormap, BoundaryNorm
-import matplotlib.patches as mpatches
+from datetime import date
+from pathlib import Path
+
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 LIGHT_PALETTE = ['#ebedf0', '#9be9a8', '#40c463', '#30a14e', '#216e39']
 DARK_PALETTE  = ['#161b22', '#0e4429', '#006d32', '#26a641', '#39d353']  # GitHub dark green scale
 
+THEME_COLORS = {  # (background, text) per theme
+    'light': ('#ffffff', '#24292f'),
+    'dark': ('#0d1117', '#c9d1d9'),
+}
+
 BOUNDS = [0, 1, 4, 7, 10, 1000]  # 0, 1-3, 4-6, 7-9, 10+
 
 DAY_LABELS = ['', 'Mon', '', 'Wed', '', 'Fri', '']  # Show Mon/Wed/Fri like GitHub
 
+MONTH_ABBR = ('', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')  # indexed by date.month
+
+# SVG layout in px: 10px squares on a 12px grid, margins leave room for labels
+CELL = 12
+SQUARE = 10
+LEFT = 30
+TOP = 16
+FONT = 'font-family="-apple-system, Segoe UI, Helvetica, Arial, sans-serif" font-size="9"'
+
 def build_array(days):
     """Return (7 x n_weeks array, start_date) where row 0 = Sunday of contribution counts."""
     if not days:
         return None, None
 
-    start = min(d for d, _ in days)
-    # Align to Sunday (Monday=0..Sunday=6)
-    if start.weekday() != 6:
-        start = start - timedelta(days=(start.weekday() + 1))
+    import numpy as np  # deferred so the no-data path skips the import
+
+    # The range comes from the first and last day; calendar_days is already in
+    # date order, so this sort is a single linear pass in the common case
+    days = sorted(days)
+    ords = np.fromiter((d.toordinal() for d, _ in days), dtype=np.int64, count=len(days))
 
-    counts = {d: c for d, c in days}
-    end = max(d for d, _ in days)
+    # Align to Sunday: proleptic ordinals are multiples of 7 exactly on Sundays
+    start_ord = int(ords[0])
+    start_ord -= start_ord % 7
+    start = date.fromordinal(start_ord)
 
-    weeks = []
-    cur = start
-    while cur <= end:
-        sunday = cur if cur.weekday() == 6 else cur - timedelta(days=(cur.weekday() + 1))
-        week_counts = [counts.get(sunday + timedelta(days=o), 0) for o in range(7)]
-        weeks.append(week_counts)
-        cur = sunday + timedelta(days=7)
+    offsets = ords - start_ord
+    vals = np.fromiter((c for _, c in days), dtype=np.int32, count=len(days))
+    n_weeks = (int(offsets[-1]) + 7) // 7
 
-    return np.array(weeks).T, start  # shape (7, n_weeks), start date
+    return _scatter(offsets, vals, n_weeks), start  # shape (7, n_weeks), start date
+
+def _scatter(offsets, vals, n_weeks):
+    """Scatter counts by day offset into a week-major buffer; return it as a C-contiguous (7, n_weeks) grid."""
+    import numpy as np
+
+    flat = np.zeros(n_weeks * 7, dtype=np.int32)
+    flat[offsets] = vals
+    return np.ascontiguousarray(flat.reshape(n_weeks, 7).T)
 
 def get_month_positions(start_date, n_weeks):
     """Calculate month label positions and labels for the heatmap."""
     month_labels = []
     month_positions = []
     current_month = None
+    start_ord = start_date.toordinal()
     
     for week_idx in range(n_weeks):
-        week_start = start_date + timedelta(weeks=week_idx)
-        month = week_start.month
+        month = date.fromordinal(start_ord + 7 * week_idx).month
         
         if month != current_month:
             current_month = month
-            month_labels.append(week_start.strftime('%b'))
+            month_labels.append(MONTH_ABBR[month])
             month_positions.append(week_idx)
     
     return month_positions, month_labels
 
 def render_svg(arr, start_date, palette, out_svg, theme='light'):
-    """Render heatmap with given palette to SVG, GitHub style with month labels."""
-    if arr is None:
-        fig = plt.figure(figsize=(10, 1))
-        plt.text(0.5, 0.5, 'No data', ha='center', va='center')
-        plt.axis('off')
-        fig.savefig(out_svg, bbox_inches='tight')
-        return
+    """Render heatmap with given palette to SVG, GitHub style with month labels. Returns the SVG text."""
+    bg_color, text_color = THEME_COLORS[theme]
 
-    cmap = ListedColormap(palette)
-    norm = BoundaryNorm(BOUNDS, cmap.N)
-
-    h, w = arr.shape  # h=7 (days), w=number of weeks
-    
-    # Calculate figure size similar to GitHub
-    cell_size = 0.14  # inches per cell
-    fig_width = max(w * cell_size + 1.5, 10)  # Add space for day labels
-    fig_height = h * cell_size + 0.8  # Add space for month labels
-    
-    # Set background color based on theme
-    bg_color = 'white' if theme == 'light' else '#0d1117'
-    text_color = '#24292f' if theme == 'light' else '#c9d1d9'
-    
-    fig, ax = plt.subplots(figsize=(fig_width, fig_height), facecolor=bg_color)
-    
-    # Draw individual squares like GitHub
-    for day in range(h):
-        for week in range(w):
-            count = arr[day, week]
-            # Determine color based on count
-            color_idx = 0
-            for i, bound in enumerate(BOUNDS[1:]):
-                if count >= BOUNDS[i]:
-                    color_idx = i
-            
-            color = palette[color_idx]
-            rect = mpatches.Rectangle((week, day), 1, 1, 
-                                     linewidth=0.5, 
-                                     edgecolor=bg_color,
-                                     facecolor=color)
-            ax.add_patch(rect)
-    
-    # Set axis limits and aspect
-    ax.set_xlim(0, w)
-    ax.set_ylim(0, h)
-    ax.set_aspect('equal')
-    
-    # Add day labels on the left (like GitHub)
-    ax.set_yticks([i + 0.5 for i in range(h)])
-    ax.set_yticklabels(DAY_LABELS, fontsize=8, color=text_color)
-    ax.tick_params(left=False, labelleft=True)
-    
-    # Add month labels at the top
-    month_positions, month_labels = get_month_positions(start_date, w)
-    ax.set_xticks([pos + 0.5 for pos in month_positions])
-    ax.set_xticklabels(month_labels, fontsize=8, color=text_color, ha='left')
-    ax.tick_params(top=False, bottom=False, labeltop=True, labelbottom=False)
-    
-    # Remove spines
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-    
-    fig.patch.set_facecolor(bg_color)
-    fig.savefig(out_svg, bbox_inches='tight', facecolor=bg_color, dpi=100)
-    plt.close(fig)
+    if arr is None:
+        parts = [
+            '<svg xmlns="http://www.w3.org/2000/svg" width="600" height="40">',
+            f'<rect width="100%" height="100%" fill="{bg_color}"/>',
+            f'<text x="50%" y="50%" text-anchor="middle" dominant-baseline="middle" '
+            f'{FONT} fill="{text_color}">No data</text>',
+            '</svg>',
+        ]
+    else:
+        import numpy as np
+
+        h, w = arr.shape  # h=7 (days), w=number of weeks
+        width = LEFT + w * CELL
+        height = TOP + h * CELL
+        size = f'width="{SQUARE}" height="{SQUARE}" rx="2"'
+
+        # Empty days are drawn by one pattern-filled rect tiling the whole grid,
+        # so only days with contributions need their own square
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">',
+            f'<defs><pattern id="empty" x="{LEFT}" y="{TOP}" width="{CELL}" height="{CELL}" '
+            f'patternUnits="userSpaceOnUse"><rect {size} fill="{palette[0]}"/></pattern></defs>',
+            f'<rect width="100%" height="100%" fill="{bg_color}"/>',
+            f'<rect x="{LEFT}" y="{TOP}" width="{w * CELL}" height="{h * CELL}" fill="url(#empty)"/>',
+        ]
+
+        # Draw individual squares like GitHub, Sunday on the top row; bucket each
+        # non-zero cell and gather its palette color in one vectorized pass
+        days, weeks = np.nonzero(arr)
+        fills = np.asarray(palette)[np.searchsorted(BOUNDS[1:-1], arr[days, weeks], side='right')]
+        parts.extend(f'<rect x="{LEFT + week * CELL}" y="{TOP + day * CELL}" {size} fill="{fill}"/>'
+                     for day, week, fill in zip(days.tolist(), weeks.tolist(), fills.tolist()))
+
+        # Day labels on the left, month labels along the top
+        parts.append(f'<g {FONT} fill="{text_color}">')
+        for day, label in enumerate(DAY_LABELS):
+            if label:
+                parts.append(f'<text x="{LEFT - 4}" y="{TOP + day * CELL + SQUARE - 1}" '
+                             f'text-anchor="end">{label}</text>')
+        month_positions, month_labels = get_month_positions(start_date, w)
+        for pos, label in zip(month_positions, month_labels):
+            parts.append(f'<text x="{LEFT + pos * CELL}" y="{TOP - 5}">{label}</text>')
+        parts.append('</g>')
+        parts.append('</svg>')
+
+    svg = '\n'.join(parts) + '\n'
+    Path(out_svg).write_text(svg, encoding='utf-8')
+    return svg
 
 def main():
     if len(sys.argv) < 4:
@@ -131,18 +142,26 @@ def main():
 
     in_json, out_light, out_dark = sys.argv[1], sys.argv[2], sys.argv[3]
 
-    with open(in_json, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    if orjson is not None:
+        with open(in_json, 'rb') as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(in_json, 'r', encoding='utf-8') as f:
+            data = json.load(f)
 
-    days = [(datetime.strptime(d['date'], '%Y-%m-%d').date(), d['count'])
+    days = [(date.fromisoformat(d['date']), d['count'])
             for d in data.get('calendar_days', [])]
 
     arr, start_date = build_array(days)
 
     # Light theme
-    render_svg(arr, start_date, LIGHT_PALETTE, out_light, theme='light')
-    # Dark theme
-    render_svg(arr, start_date, DARK_PALETTE, out_dark, theme='dark')
+    svg = render_svg(arr, start_date, LIGHT_PALETTE, out_light, theme='light')
+    # Dark theme: only the colors differ, so recolor the light SVG instead of rendering again
+    light_colors = LIGHT_PALETTE + list(THEME_COLORS['light'])
+    dark_colors = DARK_PALETTE + list(THEME_COLORS['dark'])
+    for light, dark in zip(light_colors, dark_colors):
+        svg = svg.replace(light, dark)
+    Path(out_dark).write_text(svg, encoding='utf-8')
     
     print(f"✓ Generated heatmaps: {out_light}, {out_dark}")
 
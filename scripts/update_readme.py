@@ -1,4 +1,6 @@
 # Update README.md between markers and ensure heatmap embed line exists
+import os
+import re
 import sys
 from pathlib import Path
 
@@ -11,9 +13,11 @@ readme_path = Path(sys.argv[2])
 
 start_marker = '<!--CONTRIB_SUMMARY_START-->'
 end_marker = '<!--CONTRIB_SUMMARY_END-->'
+block_pattern = re.compile(re.escape(start_marker) + r'.*?' + re.escape(end_marker), re.DOTALL)
 
 summary = summary_path.read_text(encoding='utf-8')
-readme = readme_path.read_text(encoding='utf-8')
+old_bytes = readme_path.read_bytes()
+readme = old_bytes.decode('utf-8')
 
 # Correct picture block with proper img tags
 picture_block = (
@@ -24,15 +28,20 @@ picture_block = (
     '</picture>\n'
 )
 
-if start_marker not in readme or end_marker not in readme:
-    block = f"\n\n{start_marker}\n{summary}\n{picture_block}{end_marker}\n"
-    readme += block
-else:
-    pre, rest = readme.split(start_marker, 1)
-    cur, post = rest.split(end_marker, 1)
-    new_block = f"{start_marker}\n{summary}\n{picture_block}{end_marker}"
-    readme = pre + new_block + post
+new_block = f"{start_marker}\n{summary}\n{picture_block}{end_marker}"
+# Callable replacement so backslashes in the summary are not read as group references
+readme, n = block_pattern.subn(lambda m: new_block, readme, count=1)
+if n == 0:
+    readme += f"\n\n{new_block}\n"
 
-readme_path.write_text(readme, encoding='utf-8')
-print('README updated.')
+new_bytes = readme.encode('utf-8')
+if new_bytes == old_bytes:
+    # Leave the file (and its mtime) alone so CI sees no change
+    print('README unchanged.')
+else:
+    # Write a sibling temp file and swap it in so README.md is never half-written
+    tmp_path = readme_path.with_suffix('.tmp')
+    tmp_path.write_bytes(new_bytes)
+    os.replace(tmp_path, readme_path)
+    print('README updated.')
 